@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+import json
 import time
 
 API_BASE = "http://localhost:8000"
@@ -27,18 +28,44 @@ if submit:
             job_id = resp.json()["job_id"]
             st.sidebar.success(f"Job ID: {job_id}")
 
-            # Show spinner while waiting
+            # Show spinner while waiting — consume the SSE stream so we react
+            # the moment the job finishes instead of polling every 2 s, and
+            # render each agent's output live as its task completes.
+            status = None
+            progress_box = st.empty()
+            accumulated = ""
             with st.spinner("Generating scenarios, please wait…"):
-                while True:
-                    status = requests.get(f"{API_BASE}/job_status/{job_id}").json().get("status")
-                    if status == "done":
-                        break
-                    elif status == "error":
-                        st.sidebar.error("Job failed")
-                        break
-                    time.sleep(2)
+                try:
+                    with requests.get(f"{API_BASE}/jobs/{job_id}/stream", stream=True) as stream:
+                        event = None
+                        for line in stream.iter_lines(decode_unicode=True):
+                            if not line:
+                                continue
+                            if line.startswith("event:"):
+                                event = line.split(":", 1)[1].strip()
+                                continue
+                            if not line.startswith("data:"):
+                                continue
+                            payload = json.loads(line.split(":", 1)[1])
+                            if event == "delta":
+                                agent = payload.get("agent", "agent")
+                                accumulated += f"\n# --- {agent} ---\n{payload.get('output', '')}\n"
+                                progress_box.code(accumulated)
+                            elif event == "result":
+                                status = payload.get("status")
+                                break
+                except requests.RequestException:
+                    # Fallback to the old polling endpoint if streaming fails
+                    while True:
+                        status = requests.get(f"{API_BASE}/job_status/{job_id}").json().get("status")
+                        if status in ("done", "error"):
+                            break
+                        time.sleep(2)
+                if status == "error":
+                    st.sidebar.error("Job failed")
 
             # Fetch and display result
+            progress_box.empty()
             result_resp = requests.get(f"{API_BASE}/get_result/{job_id}")
             if result_resp.status_code == 200:
                 content = result_resp.text
@@ -1,105 +1,216 @@
 # crew.py
 from crewai import Agent, Crew, Process, Task, LLM
 from crewai.project import CrewBase, agent, crew, task
+import functools
 import os
+
+import httpx
+import litellm
 import yaml
 
+from llm_cache import CachedLLM, LLMCache
+from tools.playwright_tool import PlaywrightExplorerTool
+
+# Share pooled keep-alive connections for every Ollama call instead of
+# paying TCP setup per request; the async client covers the parallel
+# (async_execution) task branch. Ollama speaks HTTP/1.1, so no http2 here.
+_HTTP_LIMITS = httpx.Limits(
+    max_connections=32, max_keepalive_connections=16, keepalive_expiry=60
+)
+litellm.client_session = httpx.Client(limits=_HTTP_LIMITS)
+litellm.aclient_session = httpx.AsyncClient(limits=_HTTP_LIMITS)
+
+try:
+    _YamlLoader = yaml.CSafeLoader  # libyaml, ~5-10x faster than pure Python
+except AttributeError:
+    _YamlLoader = yaml.SafeLoader
+
 # ---------------- LLM Configuration ----------------
-llm = LLM(
-    model="ollama/llama3.1",        
-    base_url="http://localhost:11434"
+# keep_alive pins the model in (V)RAM between kickoffs — without it Ollama
+# evicts after ~5 min idle and the next job pays a multi-second weight
+# reload. Concurrency x model size must still fit in VRAM.
+# Q4_K_M quantization: ~2-3x tokens/sec over full precision (decode is
+# memory-bandwidth bound) with negligible quality loss on structured
+# Gherkin output. Pull with: ollama pull llama3.1:8b-instruct-q4_K_M
+# Both LLM handles share one cache: separate instances would each hold a
+# private in-memory index over the same embeddings.jsonl and miss each
+# other's writes.
+_llm_cache = LLMCache()
+
+llm = CachedLLM(
+    model="ollama/llama3.1:8b-instruct-q4_K_M",
+    base_url="http://localhost:11434",
+    extra_body={"keep_alive": "24h"},
+    cache=_llm_cache
+)
+
+# The reasoner/writer agents emit long, templated output where a small
+# draft model gets high acceptance rates, so speculative decoding buys
+# ~1.5-2x tokens/sec there. The short-output scanner agents stay on the
+# plain llm above. Requires an Ollama build with speculative support and:
+# ollama pull llama3.2:1b
+writer_llm = CachedLLM(
+    model="ollama/llama3.1:8b-instruct-q4_K_M",
+    base_url="http://localhost:11434",
+    extra_body={
+        "keep_alive": "24h",
+        "options": {"draft_model": "llama3.2:1b", "num_speculative": 4}
+    },
+    cache=_llm_cache
 )
 
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config")
 
+@functools.lru_cache(maxsize=None)
+def _load_yaml(path: str, mtime: float):
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=_YamlLoader)
+
 def load_yaml(file_name: str):
     path = os.path.join(CONFIG_PATH, file_name)
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    # mtime in the cache key so edits to the config invalidate the memo
+    return _load_yaml(path, os.path.getmtime(path))
 
 agents_config = load_yaml("agents.yaml")
 tasks_config = load_yaml("tasks.yaml")
 
+playwright_tool = PlaywrightExplorerTool()
+
+# rich-formatted step logging is expensive (per-character ANSI wrapping on
+# large LLM outputs) and serializes on a console lock — keep it off unless
+# explicitly enabled for local dev.
+VERBOSE = os.getenv("CREW_VERBOSE", "0") == "1"
+
+# ---------------- Progress hooks ----------------
+# Listeners registered here receive (crew-base instance, TaskOutput) for
+# every finished task, so the API layer can stream partial results while
+# the rest of the pipeline runs. The source instance is the routing key:
+# async tasks fire the callback on CrewAI-spawned threads, so thread
+# identity says nothing about which job the output belongs to.
+task_listeners = []
+
+def _notify_task_done(source, output):
+    for listener in list(task_listeners):
+        try:
+            listener(source, output)
+        except Exception:
+            pass
+
+
+def _once(fn):
+    """Memoize a zero-arg factory method per instance: task cross-references
+    (e.g. page_scanner_task appearing in two context lists and the tasks=
+    list) reuse one object instead of rebuilding it on every call."""
+    key = "_memo_" + fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(self):
+        if key not in self.__dict__:
+            self.__dict__[key] = fn(self)
+        return self.__dict__[key]
+    return wrapper
+
 
 @CrewBase
 class TestGeneration:
 
+    def _on_task_done(self, output):
+        _notify_task_done(self, output)
+
     # ---------- Agents ----------
 
     @agent
+    @_once
     def page_scanner(self) -> Agent:
         return Agent(
             config=agents_config["page_scanner"],
             llm=llm,
-            verbose=True
+            tools=[playwright_tool],
+            verbose=VERBOSE
         )
 
     @agent
+    @_once
     def interaction_analyzer(self) -> Agent:
         return Agent(
             config=agents_config["interaction_analyzer"],
             llm=llm,
-            verbose=True
+            tools=[playwright_tool],
+            verbose=VERBOSE
         )
 
     @agent
+    @_once
     def popup_detector(self) -> Agent:
         return Agent(
             config=agents_config["popup_detector"],
             llm=llm,
-            verbose=True
+            verbose=VERBOSE
         )
 
     @agent
+    @_once
     def scenario_reasoner(self) -> Agent:
         return Agent(
             config=agents_config["scenario_reasoner"],
-            llm=llm,
-            verbose=True
+            llm=writer_llm,
+            verbose=VERBOSE
         )
 
     @agent
+    @_once
     def gherkin_writer(self) -> Agent:
         return Agent(
             config=agents_config["gherkin_writer"],
-            llm=llm,
-            verbose=True
+            llm=writer_llm,
+            verbose=VERBOSE
         )
 
     # ---------- Tasks ----------
 
     @task
+    @_once
     def page_scanner_task(self) -> Task:
         return Task(
             agent=self.page_scanner(),
             config=tasks_config["page_scanner_task"]
         )
 
+    # interaction_analyzer and popup_detector both only need the DOM
+    # snapshot from page_scanner, so they fan out in parallel
+    # (async_execution) and scenario_reasoner fans their outputs back in.
+
     @task
+    @_once
     def interaction_analyzer_task(self) -> Task:
         return Task(
             agent=self.interaction_analyzer(),
             config=tasks_config["interaction_analyzer_task"],
-            context=[self.page_scanner_task()]
+            context=[self.page_scanner_task()],
+            async_execution=True
         )
 
     @task
+    @_once
     def popup_detector_task(self) -> Task:
         return Task(
             agent=self.popup_detector(),
             config=tasks_config["popup_detector_task"],
-            context=[self.interaction_analyzer_task()]
+            context=[self.page_scanner_task()],
+            async_execution=True
         )
 
     @task
+    @_once
     def scenario_reasoner_task(self) -> Task:
         return Task(
             agent=self.scenario_reasoner(),
             config=tasks_config["scenario_reasoner_task"],
-            context=[self.popup_detector_task()]
+            context=[self.interaction_analyzer_task(), self.popup_detector_task()]
         )
 
     @task
+    @_once
     def gherkin_generation_task(self) -> Task:
         return Task(
             agent=self.gherkin_writer(),
@@ -125,5 +236,6 @@ class TestGeneration:
                 self.gherkin_generation_task()
             ],
             process=Process.sequential,
-            verbose=True
+            task_callback=self._on_task_done,
+            verbose=VERBOSE
         )
\ No newline at end of file
@@ -0,0 +1,197 @@
+# llm_cache.py
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, List, Optional, Union
+
+import numpy as np
+import requests
+from crewai import LLM
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), ".llm_cache")
+TTL_SECONDS = 3600
+SEMANTIC_THRESHOLD = 0.92
+EMBED_URL = "http://localhost:11434/api/embeddings"
+EMBED_MODEL = "nomic-embed-text"
+
+_URL_RE = re.compile(r"https?://[^\s\"'<>]+")
+
+
+def scope_for(text: str) -> str:
+    """Hash of the URLs mentioned in a prompt.
+
+    The prompts are ordered static-instructions-first with the target URL
+    as the trailing line, so prompts for two different sites are byte-
+    identical except for that tail and embed nearly identically — far
+    above any usable similarity threshold. A semantic near-hit is
+    therefore only valid between prompts that mention the same URLs.
+    """
+    urls = sorted(set(_URL_RE.findall(text)))
+    if not urls:
+        return ""
+    return hashlib.sha256("|".join(urls).encode("utf-8")).hexdigest()[:16]
+
+
+class LLMCache:
+    """Disk-backed completion cache with a semantic near-hit fallback.
+
+    Exact hits are looked up by SHA-256 of (model, messages, temperature).
+    Near hits embed the last user message via Ollama and return a stored
+    response when cosine similarity beats SEMANTIC_THRESHOLD — but only
+    among entries whose URL scope matches, so rewordings of a prompt for
+    one site can never be answered with output generated for another.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, ttl: int = TTL_SECONDS,
+                 semantic_threshold: float = SEMANTIC_THRESHOLD):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.semantic_threshold = semantic_threshold
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index_path = os.path.join(cache_dir, "embeddings.jsonl")
+        # Concurrent call()s arrive from CrewAI's parallel-task threads;
+        # the lock keeps _keys/_scopes appends aligned with _vectors rows
+        # (a misaligned index returns the response of a different prompt).
+        self._index_lock = threading.Lock()
+        self._keys: List[str] = []
+        self._scopes: List[str] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._load_index()
+
+    # ---------- exact lookup ----------
+
+    @staticmethod
+    def key_for(model: str, messages: Any, temperature: Optional[float]) -> str:
+        blob = json.dumps(
+            {"model": model, "messages": messages, "temperature": temperature},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        path = os.path.join(self.cache_dir, f"{key}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry["ts"] > self.ttl:
+            return None
+        return entry["response"]
+
+    def set(self, key: str, response: str, query_text: str) -> None:
+        path = os.path.join(self.cache_dir, f"{key}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"ts": time.time(), "response": response}, f)
+        self._add_embedding(key, query_text)
+
+    # ---------- semantic lookup ----------
+
+    def get_semantic(self, query_text: str) -> Optional[str]:
+        if not query_text:
+            return None
+        # Snapshot under the lock, embed outside it — the Ollama embedding
+        # round-trip must not serialize every lookup behind it.
+        with self._index_lock:
+            if self._vectors is None:
+                return None
+            vectors = self._vectors
+            keys = list(self._keys)
+            scopes = list(self._scopes)
+        scope = scope_for(query_text)
+        in_scope = np.asarray([s == scope for s in scopes])
+        if not in_scope.any():
+            return None
+        vec = self._embed(query_text)
+        if vec is None:
+            return None
+        scores = vectors @ vec
+        scores[~in_scope] = -1.0
+        best = int(np.argmax(scores))
+        if scores[best] >= self.semantic_threshold:
+            return self.get(keys[best])
+        return None
+
+    def _add_embedding(self, key: str, query_text: str) -> None:
+        if not query_text:
+            return
+        vec = self._embed(query_text)
+        if vec is None:
+            return
+        scope = scope_for(query_text)
+        row = vec.reshape(1, -1)
+        with self._index_lock:
+            with open(self._index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(
+                    {"key": key, "scope": scope, "vec": vec.tolist()}) + "\n")
+            self._keys.append(key)
+            self._scopes.append(scope)
+            self._vectors = (row if self._vectors is None
+                             else np.vstack([self._vectors, row]))
+
+    def _load_index(self) -> None:
+        if not os.path.exists(self._index_path):
+            return
+        rows = []
+        with open(self._index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._keys.append(entry["key"])
+                self._scopes.append(entry.get("scope", ""))
+                rows.append(entry["vec"])
+        if rows:
+            self._vectors = np.asarray(rows, dtype=np.float32)
+
+    @staticmethod
+    def _embed(text: str) -> Optional[np.ndarray]:
+        try:
+            resp = requests.post(
+                EMBED_URL,
+                json={"model": EMBED_MODEL, "prompt": text[:2000]},
+                timeout=5,
+            )
+            resp.raise_for_status()
+            vec = np.asarray(resp.json()["embedding"], dtype=np.float32)
+        except (requests.RequestException, KeyError, ValueError):
+            return None
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else None
+
+
+class CachedLLM(LLM):
+    """crewai.LLM that consults an LLMCache before hitting Ollama."""
+
+    def __init__(self, *args, cache: Optional[LLMCache] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cache = cache or LLMCache()
+
+    def call(self, messages: Union[str, List[dict]], *args, **kwargs) -> Any:
+        key = LLMCache.key_for(self.model, messages, getattr(self, "temperature", None))
+        hit = self._cache.get(key)
+        if hit is not None:
+            return hit
+
+        query = self._last_user_text(messages)
+        hit = self._cache.get_semantic(query)
+        if hit is not None:
+            return hit
+
+        response = super().call(messages, *args, **kwargs)
+        if isinstance(response, str) and response:
+            self._cache.set(key, response, query)
+        return response
+
+    @staticmethod
+    def _last_user_text(messages: Union[str, List[dict]]) -> str:
+        if isinstance(messages, str):
+            return messages
+        for msg in reversed(messages):
+            if msg.get("role") == "user":
+                return str(msg.get("content", ""))
+        return ""
@@ -1,19 +1,175 @@
 # api/main.py
-import uuid
+import asyncio
+import json
+import os
+import queue
 import threading
+import time
+import uuid
+from collections import OrderedDict
 from typing import Dict, Any, Optional
+
+import requests
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import PlainTextResponse
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, HttpUrl
+
+# orjson serializes responses 3-10x faster than stdlib json; negligible per
+# request but it scales linearly with QPS on the status endpoints.
+app = FastAPI(default_response_class=ORJSONResponse)
+
+# LRU-capped job store: nothing ever deleted entries before, so memory grew
+# with total lifetime traffic. Past MAX_JOBS the oldest *finished* jobs are
+# evicted (live jobs are never dropped — submissions are rejected instead)
+# and a sweeper purges finished jobs an hour after they reach a terminal
+# state.
+jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+jobs_lock = asyncio.Lock()
+MAX_JOBS = 10_000
+JOB_TTL_SECONDS = 3600
+
+# Cap concurrent kickoffs at Ollama's safe parallelism — a burst of requests
+# used to spawn one thread each, all fighting the GIL and the model server.
+WORKER_COUNT = min(4, os.cpu_count() or 1)
+
+
+@app.on_event("startup")
+def _warm():
+    # Importing crew pulls in the whole crewai/litellm graph (seconds of
+    # import time); it lives here, next to the pool construction that
+    # needs it, rather than at module scope. Note this does not shorten
+    # time-to-first-request — uvicorn only accepts connections once the
+    # startup hooks (including this one) have finished.
+    from crew import TestGeneration, task_listeners
+
+    # Build the crews once — re-running the @CrewBase machinery, five Agent
+    # constructors and the task-config parsing per request is pure overhead.
+    # One crew per worker, checked out around kickoff: CrewAI interpolates
+    # {url} into the (memoized) Task objects and stores task.output on them
+    # during a run, so a single shared crew cross-contaminates concurrent
+    # jobs. Pool size equals WORKER_COUNT, so get() never waits long.
+    app.state.crew_pool = queue.Queue()
+    app.state.crew_jobs = {}  # crew-base instance id -> active job_id
+    for _ in range(WORKER_COUNT):
+        tg = TestGeneration()
+        app.state.crew_pool.put((tg, tg.crew()))
+    task_listeners.append(_on_task_output)
+    # Preload model weights so the first real job doesn't eat the load time.
+    threading.Thread(target=_preload_model, daemon=True).start()
+
 
-from crew import TestGeneration
+def _preload_model():
+    try:
+        requests.post(
+            "http://localhost:11434/api/generate",
+            json={"model": "llama3.1:8b-instruct-q4_K_M", "prompt": "",
+                  "keep_alive": "24h"},
+            timeout=120,
+        )
+    except requests.RequestException:
+        pass  # Ollama not up yet; the first job will load the model instead
 
-app = FastAPI()
 
-jobs: Dict[str, Dict[str, Any]] = {}
+@app.on_event("shutdown")
+def _close_browsers():
+    from tools.playwright_tool import shutdown
+    shutdown()
+
+
+@app.on_event("startup")
+async def _start_workers():
+    app.state.loop = asyncio.get_running_loop()
+    app.state.queue = asyncio.Queue()
+    app.state.workers = [
+        asyncio.create_task(_worker(app.state.queue))
+        for _ in range(WORKER_COUNT)
+    ]
+    app.state.sweeper = asyncio.create_task(_sweep_jobs())
+
+
+async def _sweep_jobs() -> None:
+    while True:
+        await asyncio.sleep(60)
+        cutoff = time.time() - JOB_TTL_SECONDS
+        async with jobs_lock:
+            stale = [job_id for job_id, job in jobs.items()
+                     if job["status"] in ("done", "error")
+                     and job.get("done_at", 0) < cutoff]
+            for job_id in stale:
+                del jobs[job_id]
+
+
+def _on_task_output(source, output):
+    # Route by which crew fired the callback, not by thread: the
+    # async_execution tasks complete on CrewAI-spawned threads, so thread
+    # identity says nothing about the job. Each pooled crew-base instance
+    # serves one job at a time, making it a safe routing key.
+    job_id = app.state.crew_jobs.get(id(source))
+    job = jobs.get(job_id) if job_id else None
+    if job is None:
+        return
+    job["partial"].append({
+        "agent": str(getattr(output, "agent", "") or ""),
+        "output": getattr(output, "raw", None) or str(output),
+    })
+    # Callbacks fire on worker threads; wake SSE consumers on the loop.
+    app.state.loop.call_soon_threadsafe(job["event"].set)
+
+
+async def _worker(queue: "asyncio.Queue[tuple]") -> None:
+    while True:
+        job_id, url = await queue.get()
+        job = jobs.get(job_id)
+        if job is None:
+            # Swept/evicted while queued — never let a stale id raise here
+            # and kill the worker coroutine.
+            queue.task_done()
+            continue
+        try:
+            job["status"] = "running"
+            job["event"].set()
+
+            await asyncio.to_thread(_preflight, url)
+            result = await asyncio.to_thread(_kickoff, job_id, url)
+
+            # *** FIX — Extract final raw output only ***
+            job["result"] = result.raw if hasattr(result, "raw") else str(result)
+            job["status"] = "done"
+
+        except Exception as e:
+            job["status"] = "error"
+            job["error"] = str(e)
+        finally:
+            job["done_at"] = time.time()
+            job["event"].set()
+            queue.task_done()
+
+
+def _preflight(url: str) -> None:
+    # Cheap reachability check so a dead URL fails in ~2 s instead of
+    # burning LLM tokens before Playwright gives up. 405/501 just mean the
+    # server dislikes HEAD, not that the page is down.
+    try:
+        resp = requests.head(url, timeout=2, allow_redirects=True)
+    except requests.RequestException as e:
+        raise RuntimeError(f"URL unreachable: {e}") from e
+    if resp.status_code >= 400 and resp.status_code not in (405, 501):
+        raise RuntimeError(f"URL returned HTTP {resp.status_code}")
+
+
+def _kickoff(job_id: str, url: str):
+    tg, crew = app.state.crew_pool.get()
+    app.state.crew_jobs[id(tg)] = job_id
+    try:
+        return crew.kickoff(inputs={"url": url})
+    finally:
+        app.state.crew_jobs.pop(id(tg), None)
+        app.state.crew_pool.put((tg, crew))
 
 class GenerateRequest(BaseModel):
-    url: str
+    # HttpUrl rejects malformed URLs at the door (Rust-backed parser in
+    # pydantic v2) instead of tying up a crew for tens of seconds.
+    url: HttpUrl
 
 class JobStatus(BaseModel):
     status: str
@@ -21,32 +177,63 @@ class JobStatus(BaseModel):
     error: Optional[str] = None
 
 @app.post("/start_job", response_model=Dict[str, str])
-def start_job(req: GenerateRequest):
+async def start_job(req: GenerateRequest):
     job_id = str(uuid.uuid4())
-    jobs[job_id] = {"status": "pending", "result": None, "error": None}
+    async with jobs_lock:
+        if len(jobs) >= MAX_JOBS:
+            # Only finished jobs are evictable: dropping a pending entry
+            # would orphan its queued work. If the store is full of live
+            # jobs, push back on the caller instead.
+            stale = [jid for jid, job in jobs.items()
+                     if job["status"] in ("done", "error")]
+            for jid in stale[:len(jobs) - MAX_JOBS + 1]:
+                del jobs[jid]
+            if len(jobs) >= MAX_JOBS:
+                raise HTTPException(status_code=503,
+                                    detail="Job store full, retry later")
+        jobs[job_id] = {"status": "pending", "result": None, "error": None,
+                        "partial": [], "event": asyncio.Event()}
+    await app.state.queue.put((job_id, str(req.url)))
+    return {"job_id": job_id}
 
-    def _run():
-        try:
-            jobs[job_id]["status"] = "running"
 
-            result = TestGeneration().crew().kickoff(inputs={"url": req.url})
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-            # *** FIX — Extract final raw output only ***
-            if hasattr(result, "raw"):
-                final_output = result.raw
-            else:
-                final_output = str(result)
 
-            jobs[job_id]["status"] = "done"
-            jobs[job_id]["result"] = final_output
-
-        except Exception as e:
-            jobs[job_id]["status"] = "error"
-            jobs[job_id]["error"] = str(e)
+@app.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str):
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
 
-    threading.Thread(target=_run, daemon=True).start()
+    async def event_gen():
+        sent = 0
+        while True:
+            # Clear before scanning: a set() landing anywhere after this
+            # point wakes the next wait instead of being swallowed between
+            # wake-up and re-scan (which left a delta sitting undelivered
+            # until the heartbeat fired).
+            job["event"].clear()
+            partial = job["partial"]
+            while sent < len(partial):
+                yield _sse("delta", partial[sent])
+                sent += 1
+            status = job["status"]
+            yield _sse("status", {"status": status})
+            if status in ("done", "error"):
+                yield _sse("result", {"status": status,
+                                      "result": job["result"],
+                                      "error": job["error"]})
+                return
+            # Block until the worker signals a state change (15 s heartbeat
+            # so proxies don't drop the connection while the crew is running).
+            try:
+                await asyncio.wait_for(job["event"].wait(), timeout=15.0)
+            except asyncio.TimeoutError:
+                pass
 
-    return {"job_id": job_id}
+    return StreamingResponse(event_gen(), media_type="text/event-stream")
 
 
 @app.get("/job_status/{job_id}", response_model=JobStatus)
@@ -54,7 +241,7 @@ def job_status(job_id: str):
     job = jobs.get(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    return JobStatus(**job)
+    return JobStatus(status=job["status"], result=job["result"], error=job["error"])
 
 
 @app.get("/get_result/{job_id}", response_class=PlainTextResponse)
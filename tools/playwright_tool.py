@@ -0,0 +1,957 @@
+# tools/playwright_tool.py
+import asyncio
+import atexit
+import hashlib
+import json
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urljoin
+
+import numpy as np
+from typing import Any, Dict, List, Optional, Type, Union
+
+from crewai.tools import BaseTool
+from playwright.async_api import async_playwright
+from playwright.sync_api import sync_playwright
+from pydantic import BaseModel, Field, PrivateAttr
+
+DEFAULT_VIEWPORT = {"width": 1280, "height": 800}
+
+MAX_CONTEXTS = 4
+
+# Requests dropped before they leave the browser. The explorer only reads
+# DOM structure and hover reactions, so images/media/fonts and tracking
+# beacons are pure page weight — blocking them shrinks goto time and lets
+# networkidle settle much earlier on media-heavy pages.
+_BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+_BLOCKED_URL_SNIPPETS = (
+    "googletagmanager", "google-analytics", "doubleclick",
+    "hotjar", "segment.io",
+)
+
+
+def _should_block(request) -> bool:
+    if request.resource_type in _BLOCKED_RESOURCE_TYPES:
+        return True
+    url = request.url
+    return any(snippet in url for snippet in _BLOCKED_URL_SNIPPETS)
+
+
+def _block_route_sync(route) -> None:
+    if _should_block(route.request):
+        route.abort()
+    else:
+        route.continue_()
+
+
+async def _block_route_async(route) -> None:
+    if _should_block(route.request):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+BROWSER_IDLE_TIMEOUT = 30.0
+
+
+class _BrowserWorker(threading.Thread):
+    """Dedicated thread owning one sync Playwright browser.
+
+    The sync API is bound to the thread that started it, so every call on
+    the browser — including close — must happen here. Sessions arrive on a
+    queue; going BROWSER_IDLE_TIMEOUT seconds without one closes the
+    browser (the next session pays a relaunch)."""
+
+    def __init__(self, idle_timeout: float):
+        super().__init__(daemon=True)
+        self._tasks: queue.Queue = queue.Queue()
+        self._idle_timeout = idle_timeout
+        self._pw = None
+        self._browser = None
+
+    def run(self):
+        while True:
+            try:
+                item = self._tasks.get(timeout=self._idle_timeout)
+            except queue.Empty:
+                self._close_browser()
+                continue
+            if item is None:
+                self._close_browser()
+                return
+            session, context_kwargs, future = item
+            try:
+                future.set_result(self._session(session, context_kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def submit(self, session, context_kwargs):
+        """Run session(context) on this worker's thread and wait for it."""
+        future: Future = Future()
+        self._tasks.put((session, context_kwargs, future))
+        return future.result()
+
+    def stop(self):
+        self._tasks.put(None)
+
+    def _ensure_browser(self):
+        if self._browser is None or not self._browser.is_connected():
+            self._pw = sync_playwright().start()
+            self._browser = self._pw.chromium.launch(
+                headless=True, args=["--no-sandbox"])
+        return self._browser
+
+    def _session(self, session, context_kwargs):
+        ctx = self._ensure_browser().new_context(**context_kwargs)
+        try:
+            return session(ctx)
+        finally:
+            try:
+                ctx.close()
+            except Exception:
+                pass
+
+    def _close_browser(self):
+        if self._browser is None:
+            return
+        try:
+            self._browser.close()
+            self._pw.stop()
+        except Exception:
+            pass
+        self._pw = self._browser = None
+
+
+class _BrowserPool:
+    """Bounded checkout/checkin pool of warm Chromium instances.
+
+    Cold-starting Chromium costs ~0.5-1.5 s per launch, but keeping
+    browsers on caller threads leaks: CrewAI runs async tasks on a fresh
+    thread per task, so a thread-local browser there is never reused and
+    never closed. Each pooled browser instead lives on its own long-lived
+    worker thread; callers check a worker out, the session runs on that
+    thread, and the worker goes back in the pool. At most `size` browsers
+    exist, and idle ones are reaped by their owning worker.
+    """
+
+    def __init__(self, size: int = MAX_CONTEXTS,
+                 idle_timeout: float = BROWSER_IDLE_TIMEOUT):
+        self._workers = [_BrowserWorker(idle_timeout) for _ in range(size)]
+        self._idle: "queue.Queue[_BrowserWorker]" = queue.Queue()
+        for worker in self._workers:
+            worker.start()
+            self._idle.put(worker)
+
+    def run(self, session, **context_kwargs):
+        """Run session(context) in a fresh context on a pooled browser."""
+        worker = self._idle.get()
+        try:
+            return worker.submit(session, context_kwargs)
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        for worker in self._workers:
+            worker.stop()
+
+
+browser_pool = _BrowserPool()
+
+
+class _AsyncBrowserHost:
+    """Dedicated event-loop thread owning one warm async Chromium.
+
+    The dynamic explorer is async (its workload is almost entirely CDP
+    round-trips), but callers are sync tool/agent code. Hosting the loop in
+    a daemon thread lets sync callers submit coroutines while the browser
+    stays warm across runs and all async Playwright objects live on one
+    loop.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        # Taken on the host loop: two coroutines racing the lazy launch
+        # would otherwise both see no browser and leak one of the pair.
+        self._browser_lock = asyncio.Lock()
+        self._pw = None
+        self._browser = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, daemon=True
+                ).start()
+            return self._loop
+
+    def submit(self, coro):
+        """Run a coroutine on the host loop from sync code and wait for it."""
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        return future.result()
+
+    async def browser(self):
+        async with self._browser_lock:
+            if self._browser is None or not self._browser.is_connected():
+                self._pw = await async_playwright().start()
+                self._browser = await self._pw.chromium.launch(
+                    headless=True, args=["--no-sandbox"])
+            return self._browser
+
+    def close(self):
+        if self._loop is None:
+            return
+
+        async def _shutdown():
+            if self._browser is not None:
+                try:
+                    await self._browser.close()
+                    await self._pw.stop()
+                except Exception:
+                    pass
+
+        try:
+            self.submit(_shutdown())
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+        self._browser = None
+
+
+async_host = _AsyncBrowserHost()
+
+
+def shutdown():
+    browser_pool.close()
+    async_host.close()
+
+
+atexit.register(shutdown)
+
+# ---------------- In-page scripts ----------------
+
+# Records hover targets and DOM mutations so the Python side can see which
+# regions of the page react to the mouse. Hover events are pre-aggregated
+# in-page in a Map keyed by element fingerprint — a grid sweep fires
+# thousands of near-duplicate pointerover events, and counting them here
+# shrinks the CDP payload 10-100x versus shipping every raw event.
+_INSTALL_SCRIPT = """
+() => {
+  window.__hover_events = new Map();
+  window.__dom_mutations = [];
+  // 32-bit FNV-1a over the fingerprint: integer Map keys are cheaper to
+  // hash than ~80-byte strings, smaller over CDP, and slot straight into
+  // int arrays on the Python side.
+  const h32 = (s) => {
+    let h = 2166136261 >>> 0;
+    for (let i = 0; i < s.length; i++) {
+      h ^= s.charCodeAt(i);
+      h = Math.imul(h, 16777619);
+    }
+    return h >>> 0;
+  };
+  const record = (e) => {
+    const t = e.target;
+    if (!t || !t.getBoundingClientRect) return;
+    const r = t.getBoundingClientRect();
+    const idx = t.parentNode
+      ? Array.prototype.indexOf.call(t.parentNode.children, t) : 0;
+    const cls = (t.className || '').toString().slice(0, 64);
+    const txt = (t.innerText || '').trim().slice(0, 80);
+    const bbox = {x: r.x, y: r.y, w: r.width, h: r.height};
+    const key = h32(t.tagName + '|' + cls + '|' + idx + '|' +
+                    bbox.x + '|' + bbox.y + '|' + txt.slice(0, 40));
+    const m = window.__hover_events;
+    const prev = m.get(key);
+    if (prev) {
+      prev.count++;
+      prev.bbox = bbox;
+    } else {
+      m.set(key, {k: key, tag: t.tagName, cls: cls, idx: idx, txt: txt,
+                  bbox: bbox, count: 1, ts: performance.now()});
+    }
+  };
+  document.addEventListener('pointerover', record, true);
+  document.addEventListener('mouseenter', record, true);
+  // Compact descriptors only: these records are just a "something was
+  // revealed/removed" signal, and a single React re-render can emit
+  // thousands of them — shipping outerHTML would balloon the array to
+  // multi-megabyte JSON. Hard cap keeps pathological pages bounded.
+  const compact = (n) => ({
+    tag: n.tagName,
+    id: n.id || '',
+    cls: (n.className || '').toString().slice(0, 64),
+    txt: (n.innerText || '').slice(0, 80)
+  });
+  const obs = new MutationObserver((muts) => {
+    if (window.__dom_mutations.length > 2000) return;
+    for (const m of muts) {
+      m.addedNodes.forEach((n) => {
+        if (n.nodeType !== 1) return;
+        window.__dom_mutations.push(
+          Object.assign({kind: 'added', ts: performance.now()}, compact(n)));
+      });
+      m.removedNodes.forEach((n) => {
+        if (n.nodeType !== 1) return;
+        window.__dom_mutations.push(
+          Object.assign({kind: 'removed', ts: performance.now()}, compact(n)));
+      });
+    }
+  });
+  // As an init script this runs at document-start, before body exists.
+  const start = () => obs.observe(document.body, {
+    childList: true, subtree: true,
+    attributes: true, attributeFilter: ['class', 'style']
+  });
+  if (document.body) {
+    start();
+  } else {
+    document.addEventListener('DOMContentLoaded', start);
+  }
+}
+"""
+
+# Read-and-clear both instrumentation buffers in one round-trip. Only the
+# mutation COUNT crosses the wire — the descriptors themselves are never
+# consumed Python-side, so serializing up to 2000 of them per fetch was
+# wasted CDP payload. Clearing as we read also keeps the buffers from
+# pinning memory across a long probe.
+_DRAIN_SCRIPT = """
+() => {
+  const events = Array.from(window.__hover_events.values());
+  const mutations = window.__dom_mutations.length;
+  window.__hover_events = new Map();
+  window.__dom_mutations = [];
+  return {events, mutations};
+}
+"""
+
+# Collects visible text/link-bearing elements for each hover cluster.
+# Takes ALL cluster bboxes in one CDP round-trip, and instead of scanning
+# every element in body, samples document.elementsFromPoint at the bbox
+# centre and corners — Blink resolves those via its internal hit-test
+# structure in near-constant time, so cost no longer grows with DOM size.
+_CLUSTER_QUERY = """
+(bboxes) => {
+  // getBoundingClientRect/getComputedStyle are layout/style flush
+  // triggers, and the same element shows up under many sample points and
+  // in several cluster bboxes — memoize everything per node so each
+  // element is measured exactly once per evaluate.
+  const meta = new Map();
+  const info = (n) => {
+    let m = meta.get(n);
+    if (m === undefined) {
+      const r = n.getBoundingClientRect();
+      const cs = getComputedStyle(n);
+      m = {
+        w: r.width, h: r.height,
+        vis: cs.display !== 'none' && cs.visibility !== 'hidden' &&
+             parseFloat(cs.opacity || 1) > 0.03,
+        txt: (n.innerText || '').trim(),
+        href: n.getAttribute ? n.getAttribute('href') : null
+      };
+      meta.set(n, m);
+    }
+    return m;
+  };
+  return bboxes.map((b) => {
+    const cx = (b.left + b.right) / 2, cy = (b.top + b.bottom) / 2;
+    const pts = [[cx, cy],
+                 [b.left + 2, b.top + 2], [b.right - 2, b.top + 2],
+                 [b.left + 2, b.bottom - 2], [b.right - 2, b.bottom - 2]];
+    const cand = new Set();
+    for (const [x, y] of pts) {
+      if (x < 0 || y < 0) continue;
+      // elementsFromPoint returns the whole stack under the point,
+      // ancestors included, so no extra tree walk is needed.
+      for (const n of document.elementsFromPoint(x, y)) cand.add(n);
+    }
+    const out = [];
+    for (const n of cand) {
+      if (out.length >= 40) break;
+      if (n === document.body || n === document.documentElement) continue;
+      const m = info(n);
+      if (m.w < 6 || m.h < 6 || !m.vis) continue;
+      if (!m.txt && !m.href) continue;
+      out.push({tag: n.tagName, text: m.txt.slice(0, 80), href: m.href});
+    }
+    return out;
+  });
+}
+"""
+
+# Compact interactive-surface snapshot. Raw page.content() is 50-500 KB that
+# downstream agents re-tokenize several times (LLM cost grows super-linearly
+# in sequence length); this ships only the nodes an agent can act on.
+_COMPACT_SNAPSHOT = """
+() => {
+  const sel = 'a,button,input,select,textarea,[role=button],[role=link],' +
+              '[role=menuitem],[onclick]';
+  const out = [];
+  document.querySelectorAll(sel).forEach((el) => {
+    const r = el.getBoundingClientRect();
+    out.push({
+      tag: el.tagName.toLowerCase(),
+      role: el.getAttribute('role') || null,
+      id: el.id || null,
+      name: el.getAttribute('name') || null,
+      type: el.getAttribute('type') || null,
+      text: (el.innerText || el.value ||
+             el.getAttribute('aria-label') || '').trim().slice(0, 80),
+      href: el.getAttribute('href'),
+      visible: !!(r.width || r.height)
+    });
+  });
+  return out.slice(0, 400);
+}
+"""
+
+
+def _compact_snapshot(page) -> List[Dict[str, Any]]:
+    return page.evaluate(_COMPACT_SNAPSHOT)
+
+
+# Finds fixed/sticky overlays and explicit dialogs with their action
+# buttons. Overlay candidates come from a 3x3 grid of elementsFromPoint
+# samples over the viewport (overlays by definition sit on top, so the
+# hit-test stack finds them) rather than a scan of every element in body.
+_POPUP_QUERY = """
+() => {
+  const popups = [];
+  const seen = new Set();
+  const vw = window.innerWidth, vh = window.innerHeight;
+  // TreeWalker with an early bail: querySelectorAll walks the whole
+  // subtree and allocates a NodeList even though we only keep 8 buttons —
+  // cookie banners and dialogs can have very deep DOMs.
+  const collectBtns = (el, cap) => {
+    const w = document.createTreeWalker(el, NodeFilter.SHOW_ELEMENT, {
+      acceptNode: (n) => (n.tagName === 'A' || n.tagName === 'BUTTON')
+        ? NodeFilter.FILTER_ACCEPT : NodeFilter.FILTER_SKIP
+    });
+    const out = [];
+    let n;
+    while ((n = w.nextNode()) && out.length < cap) {
+      out.push({text: (n.innerText || n.textContent || '').trim().slice(0, 60),
+                href: n.getAttribute ? n.getAttribute('href') : null});
+    }
+    return out;
+  };
+  const grab = (el, kind, z) => {
+    popups.push({kind: kind, tag: el.tagName, zIndex: z,
+                 text: (el.innerText || '').trim().slice(0, 200),
+                 buttons: collectBtns(el, 8)});
+  };
+  for (const fx of [0.08, 0.5, 0.92]) {
+    for (const fy of [0.08, 0.5, 0.92]) {
+      for (const n of document.elementsFromPoint(vw * fx, vh * fy)) {
+        if (seen.has(n)) continue;
+        seen.add(n);
+        const cs = getComputedStyle(n);
+        if (cs.position !== 'fixed' && cs.position !== 'sticky') continue;
+        const r = n.getBoundingClientRect();
+        if (r.width < 80 || r.height < 40) continue;
+        const z = parseInt(cs.zIndex, 10) || 0;
+        if (z < 10) continue;
+        grab(n, 'overlay', z);
+      }
+    }
+  }
+  document.querySelectorAll('[role=dialog],[role=alertdialog],dialog')
+    .forEach((el) => {
+      if (!seen.has(el)) grab(el, 'dialog', 0);
+    });
+  return popups.slice(0, 6);
+}
+"""
+
+# Gherkin scenario fragments, assembled once at import and filled with
+# str.format_map per scenario — the line-by-line f-string append cascade
+# this replaces rebuilt every literal on each call.
+_GHERKIN_POPUP_TMPL = (
+    "  Scenario: A {kind} appears on the page\n"
+    '    Given the user opens "{url}"\n'
+    '    Then a {kind} titled "{title}" is visible'
+)
+_GHERKIN_CANCEL_TMPL = (
+    '    When the user clicks "{cancel}"\n'
+    "    Then the {kind} is dismissed"
+)
+_GHERKIN_CONT_TMPL = '    And the "{cont}" action is available'
+_GHERKIN_HOVER_TMPL = (
+    '  Scenario: Hovering "{label}" reveals content\n'
+    '    Given the user opens "{url}"\n'
+    '    When the user hovers over "{label}"'
+)
+_GHERKIN_REVEAL_TMPL = '    Then "{item}" becomes visible'
+
+
+class PlaywrightDynamicExplorer:
+    """Drives a real browser over a page: sweeps the mouse across a grid,
+    records which elements react (hover menus, overlays), detects popups,
+    verifies revealed links and emits a Gherkin sketch of what it found.
+
+    Exploration is async — the workload is almost pure CDP round-trip
+    latency, so worker contexts sweep interleaved grid rows concurrently
+    and N-URL batches run in parallel instead of back to back.
+    """
+
+    def __init__(self, workers: int = 2):
+        self.workers = max(1, workers)
+
+    def run(self, url: Union[str, List[str]],
+            total_time: float = 20.0) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        """Explore one URL (returns a dict) or a batch (returns a list)."""
+        urls = [url] if isinstance(url, str) else list(url)
+        results = async_host.submit(self._run_async(urls, total_time))
+        return results[0] if isinstance(url, str) else results
+
+    async def _run_async(self, urls: List[str],
+                         total_time: float) -> List[Dict[str, Any]]:
+        browser = await async_host.browser()
+        return await asyncio.gather(
+            *(self._run_one(browser, u, total_time) for u in urls))
+
+    async def _run_one(self, browser, url: str,
+                       total_time: float) -> Dict[str, Any]:
+        started = time.monotonic()
+        deadline = started + total_time
+
+        # One context per worker; worker k sweeps grid rows k::workers, so
+        # mouse-move RTTs and dwell sleeps overlap across contexts.
+        contexts, pages = [], []
+        try:
+            for _ in range(self.workers):
+                ctx = await browser.new_context(viewport=DEFAULT_VIEWPORT)
+                await ctx.route("**/*", _block_route_async)
+                # Instrumentation is registered as an init script BEFORE the
+                # page exists: it runs at document-start in every frame, so
+                # hover events fired during initial layout are captured, SPA
+                # navigations can't wipe the hooks, and no extra evaluate
+                # round-trip happens after goto.
+                await self._install_instrumentation(ctx)
+                page = await ctx.new_page()
+                await page.goto(url, wait_until="networkidle", timeout=60000)
+                contexts.append(ctx)
+                pages.append(page)
+
+            drained = await asyncio.gather(
+                *(self._explore_page(pages[k], deadline,
+                                     worker=k, stride=self.workers)
+                  for k in range(self.workers)))
+
+            result: Dict[str, Any] = {"url": pages[0].url}
+            result["discoveries"] = await self._aggregate_events(pages, drained)
+            result["popups"] = await self._detect_popups(pages[0])
+            result["verified_links"] = await self._safe_click_verify(
+                contexts[0], result, result["discoveries"])
+            result["gherkin"] = self._generate_gherkin(result)
+            result["probe_duration"] = round(time.monotonic() - started, 2)
+            return result
+        finally:
+            for ctx in contexts:
+                try:
+                    await ctx.close()
+                except Exception:
+                    pass
+
+    async def _install_instrumentation(self, context) -> None:
+        # The script is an arrow function; self-invoke it for init-script use.
+        await context.add_init_script(f"({_INSTALL_SCRIPT})()")
+
+    async def _dwell(self, page, cap_ms: int = 250) -> None:
+        # Event-driven dwell: return as soon as the page actually reacts (a
+        # new DOM mutation — reveals usually land in <50 ms) instead of
+        # sleeping a fixed quarter-second per cell; dead cells cost only the
+        # cap. Replaces the old fixed sleeps, which idled up to 18 s per
+        # 6x6 grid regardless of whether anything was animating.
+        prev = await page.evaluate("() => window.__dom_mutations.length")
+        try:
+            await page.wait_for_function(
+                "prev => window.__dom_mutations.length > prev",
+                arg=prev, timeout=cap_ms)
+        except Exception:
+            pass  # no reveal within the cap — move on
+
+    async def _drain(self, page) -> tuple:
+        out = await page.evaluate(_DRAIN_SCRIPT)
+        return out["events"], out["mutations"]
+
+    async def _explore_page(self, page, deadline: float,
+                            worker: int = 0, stride: int = 1) -> tuple:
+        vw = page.viewport_size or DEFAULT_VIEWPORT
+        rows, cols = 6, 6
+        cell_w = vw["width"] / cols
+        cell_h = vw["height"] / rows
+
+        # Phase 1 — grid sweep with slight jitter so we don't always hit
+        # the exact same pixel of a cell. Coordinates for the whole sweep
+        # come from two vectorized jitter draws up front instead of
+        # interpreter-level random calls per cell.
+        my_rows = np.arange(worker, rows, stride)
+        n_cells = my_rows.size * cols
+        col_idx = np.tile(np.arange(cols), my_rows.size)
+        row_idx = np.repeat(my_rows, cols)
+        cxs = (col_idx + 0.5) * cell_w + np.random.uniform(
+            -0.15, 0.15, n_cells) * cell_w
+        cys = (row_idx + 0.5) * cell_h + np.random.uniform(
+            -0.15, 0.15, n_cells) * cell_h
+        # steps=1 sends one Input.dispatchMouseEvent per cell instead of
+        # 6-20 interpolated ones — an order of magnitude fewer CDP round
+        # trips for the coarse sweep. Hover handlers key off pointerover on
+        # the destination element, which fires either way; the smooth,
+        # humanized trajectory only matters in the micro-walk below, which
+        # keeps its randomized steps.
+        for cx, cy in zip(cxs.tolist(), cys.tolist()):
+            if time.monotonic() > deadline:
+                return [], 0
+            await page.mouse.move(cx, cy, steps=1)
+            await self._dwell(page, cap_ms=250)
+
+        # Phase 2 — micro-walk around the densest hover targets from the
+        # sweep, to coax open submenus that need a dwell on the exact item.
+        # The drain hands the sweep's events to Python; anything the
+        # micro-walk triggers stays in-page for the final aggregate drain.
+        events, mutations = await self._drain(page)
+        events.sort(key=lambda e: e.get("count", 1), reverse=True)
+        seen = set()
+        centers = []
+        for ev in events[:24]:
+            bbox = ev.get("bbox") or {}
+            key = (round(bbox.get("x", 0)), round(bbox.get("y", 0)))
+            if key in seen or not bbox.get("w"):
+                continue
+            seen.add(key)
+            centers.append(bbox)
+            if len(centers) >= 5:
+                break
+        for bbox in centers:
+            if time.monotonic() > deadline:
+                break
+            cx = bbox["x"] + bbox["w"] / 2
+            cy = bbox["y"] + bbox["h"] / 2
+            for dx, dy in ((-12, 0), (12, 0), (0, -10), (0, 10)):
+                await page.mouse.move(cx + dx, cy + dy,
+                                      steps=random.randint(4, 12))
+                await self._dwell(page, cap_ms=150)
+        return events, mutations
+
+    async def _aggregate_events(self, pages,
+                                drained=()) -> List[Dict[str, Any]]:
+        # Events arrive pre-counted from the in-page Map; merge the batches
+        # the workers already drained during exploration with a final drain
+        # per page (one round-trip each, events + mutation count together),
+        # then resolve clusters against the first page (all workers loaded
+        # the same URL/layout).
+        merged: Dict[int, Dict[str, Any]] = {}
+        mutation_count = 0
+
+        def _merge(entries):
+            for t in entries:
+                # Workers loaded the same layout, so the in-page FNV-1a
+                # fingerprint hash is stable across their pages.
+                key = t.get("k", 0)
+                prev = merged.get(key)
+                if prev:
+                    prev["count"] += t.get("count", 1)
+                else:
+                    merged[key] = dict(t)
+
+        for events, mutations in drained:
+            _merge(events)
+            mutation_count += mutations
+        for page in pages:
+            events, mutations = await self._drain(page)
+            _merge(events)
+            mutation_count += mutations
+        page = pages[0]
+
+        # Top-12 selection via argpartition — O(n) instead of a full
+        # Python-object sort when a busy page yields many distinct
+        # fingerprints.
+        entries = list(merged.values())
+        if entries:
+            counts = np.asarray([t.get("count", 1) for t in entries],
+                                dtype=np.int32)
+            k = min(12, len(counts))
+            top_idx = np.argpartition(-counts, k - 1)[:k]
+            top_idx = top_idx[np.argsort(-counts[top_idx])]
+            top = [entries[i] for i in top_idx]
+        else:
+            top = []
+        query_bboxes = []
+        for t in top:
+            bbox = t.get("bbox") or {}
+            query_bboxes.append({
+                "left": bbox.get("x", 0) - 8,
+                "top": bbox.get("y", 0) - 8,
+                "right": bbox.get("x", 0) + bbox.get("w", 0) + 8,
+                "bottom": bbox.get("y", 0) + bbox.get("h", 0) + 8,
+            })
+        revealed_per_cluster = (
+            await page.evaluate(_CLUSTER_QUERY, query_bboxes)
+            if query_bboxes else [])
+
+        discoveries = []
+        for t, revealed in zip(top, revealed_per_cluster):
+            discoveries.append({
+                "tag": t.get("tag"),
+                "text": t.get("txt"),
+                "count": t.get("count", 1),
+                "bbox": t.get("bbox") or {},
+                "revealed": revealed,
+                "mutations_seen": mutation_count,
+            })
+        return discoveries
+
+    async def _detect_popups(self, page) -> List[Dict[str, Any]]:
+        return await page.evaluate(_POPUP_QUERY)
+
+    async def _safe_click_verify(self, ctx, result,
+                                 discoveries) -> List[Dict[str, Any]]:
+        # Dedup and normalize before touching the browser: mega-menus repeat
+        # the same href many times (often 50%+ duplicates), and relative
+        # links need resolving against the page URL or goto rejects them.
+        hrefs = sorted({
+            urljoin(result["url"], h)
+            for d in discoveries
+            for r in d.get("revealed", [])
+            if (h := r.get("href"))
+            and not h.startswith(("javascript:", "#", "mailto:", "tel:"))
+        })
+        if not hrefs:
+            return []
+
+        # A small round-robin page pool instead of new_page-per-href:
+        # page construction is a CDP round-trip of its own, and pooled
+        # workers overlap the network waits of up to K navigations.
+        pool_size = min(4, len(hrefs))
+        pool = [await ctx.new_page() for _ in range(pool_size)]
+        queue: asyncio.Queue = asyncio.Queue()
+        for href in hrefs:
+            queue.put_nowait(href)
+
+        verified: List[Dict[str, Any]] = []
+
+        async def verify(pg) -> None:
+            while True:
+                try:
+                    href = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    await pg.goto(href, wait_until="domcontentloaded",
+                                  timeout=8000)
+                    verified.append({"href": href, "resolved": pg.url})
+                except Exception:
+                    continue
+
+        try:
+            await asyncio.gather(*(verify(pg) for pg in pool))
+        finally:
+            for pg in pool:
+                try:
+                    await pg.close()
+                except Exception:
+                    pass
+        return verified
+
+    def _generate_gherkin(self, result) -> str:
+        blocks = [f"Feature: Dynamic UI exploration of {result['url']}"]
+        for pop in result.get("popups", []):
+            fields = {
+                "url": result["url"],
+                "kind": pop.get("kind", "popup"),
+                "title": (pop.get("text") or "").split("\n")[0][:60],
+            }
+            block = [_GHERKIN_POPUP_TMPL.format_map(fields)]
+            buttons = pop.get("buttons") or []
+            cancel = next((b["text"] for b in buttons
+                           if "cancel" in (b.get("text") or "").lower()
+                           or "close" in (b.get("text") or "").lower()), None)
+            cont = next((b["text"] for b in buttons
+                         if b.get("text") and b["text"] != cancel), None)
+            if cancel:
+                fields["cancel"] = cancel
+                block.append(_GHERKIN_CANCEL_TMPL.format_map(fields))
+            if cont:
+                block.append(_GHERKIN_CONT_TMPL.format_map({"cont": cont}))
+            blocks.append("\n".join(block))
+        for d in result.get("discoveries", []):
+            if not d.get("revealed"):
+                continue
+            label = (d.get("text") or d.get("tag") or "element")[:60]
+            block = [_GHERKIN_HOVER_TMPL.format_map(
+                {"url": result["url"], "label": label})]
+            block.extend(
+                _GHERKIN_REVEAL_TMPL.format_map(
+                    {"item": (r.get("text") or r.get("href") or "")[:60]})
+                for r in d["revealed"][:5])
+            blocks.append("\n".join(block))
+        return "\n\n".join(blocks) + "\n"
+
+
+class ExplorerInput(BaseModel):
+    url: str = Field(description="Absolute URL of the page to explore")
+    actions: Optional[List[Dict[str, Any]]] = Field(
+        default=None,
+        description=(
+            'Optional batch of actions to run in one browser session, e.g. '
+            '[{"op": "goto", "args": {"url": "..."}}, '
+            '{"op": "click", "args": {"selector": "..."}}, '
+            '{"op": "fill", "args": {"selector": "...", "value": "..."}}]. '
+            "Prefer one call with a chain of actions over many single calls."
+        ),
+    )
+
+
+class PlaywrightExplorerTool(BaseTool):
+    name: str = "playwright_explorer"
+    description: str = (
+        "Opens a page in a headless browser and reports its interactive "
+        "surface: hover-reactive elements, popups/overlays and navigations. "
+        "Pass `actions` to execute a whole chain of click/fill/goto/hover/"
+        "wait/screenshot steps in a single browser session instead of one "
+        "call per action."
+    )
+    args_schema: Type[BaseModel] = ExplorerInput
+
+    _seen_screenshots: set = PrivateAttr(default_factory=set)
+
+    def _run(self, url: str, actions: Optional[List[Dict[str, Any]]] = None) -> str:
+        # Reuse a warm browser from the pool — launching Chromium per tool
+        # call cost ~300-700 ms, dwarfing the scan itself on simple pages,
+        # and agent loops call the tool repeatedly. The session body runs
+        # on the pool worker's thread (the sync API is thread-bound); a
+        # fresh context per call keeps isolation.
+        def _session(context):
+            context.route("**/*", _block_route_sync)
+            context.add_init_script(f"({_INSTALL_SCRIPT})()")
+            page = context.new_page()
+            if actions:
+                return self.chain(page, url, actions)
+            return self._scan(page, url)
+
+        out = browser_pool.run(_session, viewport=DEFAULT_VIEWPORT)
+        return json.dumps(out)
+
+    def close(self) -> None:
+        """Tear down the pooled browsers; the tool's owner calls this at
+        process shutdown (also wired via atexit)."""
+        shutdown()
+
+    def chain(self, page, url: str,
+              actions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Execute a list of actions sequentially in one session, waiting for
+        the network to settle once at the end instead of after every step."""
+        page.goto(url, wait_until="domcontentloaded", timeout=30000)
+        screenshots = []
+        for act in actions:
+            op = act.get("op")
+            args = act.get("args") or {}
+            if op == "goto":
+                page.goto(args["url"], wait_until="domcontentloaded", timeout=30000)
+            elif op == "click":
+                page.click(args["selector"], timeout=5000)
+            elif op == "fill":
+                page.fill(args["selector"], args.get("value", ""), timeout=5000)
+            elif op == "hover":
+                page.hover(args["selector"], timeout=5000)
+            elif op == "wait":
+                page.wait_for_timeout(min(float(args.get("ms", 250)), 2000))
+            elif op == "screenshot":
+                screenshots.append(self._screenshot(page))
+        try:
+            page.wait_for_load_state("networkidle", timeout=1500)
+        except Exception:
+            pass
+        return {"url": page.url, "title": page.title(),
+                "snapshot": _compact_snapshot(page),
+                "screenshots": screenshots}
+
+    def _screenshot(self, page) -> Dict[str, Any]:
+        # Dedup by content hash so repeated snapshots of an unchanged page
+        # don't ship another 1 MB PNG through the agent context. New
+        # captures are written to disk and referenced by path — returning
+        # metadata alone would leave nothing to ever retrieve.
+        data = page.screenshot()
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in self._seen_screenshots:
+            return {"digest": digest, "status": "unchanged"}
+        self._seen_screenshots.add(digest)
+        path = os.path.join(tempfile.gettempdir(),
+                            f"playwright_explorer_{digest[:16]}.png")
+        with open(path, "wb") as f:
+            f.write(data)
+        return {"digest": digest, "status": "captured", "bytes": len(data),
+                "path": path}
+
+    def _scan(self, page, url: str) -> Dict[str, Any]:
+        page.goto(url, wait_until="networkidle", timeout=60000)
+
+        # One evaluate finds the grid cells actually sitting on something
+        # interactive; each mouse.move is a CDP round-trip, so skipping the
+        # empty cells is a 3-10x faster sweep on content-sparse pages.
+        vw = page.viewport_size or DEFAULT_VIEWPORT
+        targets = page.evaluate(
+            """(cfg) => {
+              const out = [];
+              for (let y = 40; y < cfg.h; y += cfg.dy) {
+                for (let x = 60; x < cfg.w; x += cfg.dx) {
+                  const el = document.elementFromPoint(x, y);
+                  if (!el) continue;
+                  const cs = getComputedStyle(el);
+                  if (cs.cursor === 'pointer' ||
+                      ['A', 'BUTTON'].includes(el.tagName) ||
+                      el.onmouseover ||
+                      el.getAttribute('role') === 'button') {
+                    out.push([x, y]);
+                  }
+                }
+              }
+              return out;
+            }""",
+            {"w": vw["width"], "h": vw["height"], "dx": 120, "dy": 80})
+        for x, y in targets:
+            page.mouse.move(x, y, steps=random.randint(3, 8))
+            time.sleep(0.05)
+
+        hover_events = page.evaluate(
+            "() => Array.from(window.__hover_events.values())"
+            ".sort((a, b) => b.count - a.count)")
+
+        # Try clicking the hover targets by their text and record where
+        # navigation lands. Empty text matches everything, >80-char text is
+        # never a stable locator, and duplicates just re-verify — each junk
+        # attempt used to burn the full 3 s navigation timeout.
+        navigations = []
+        seen = set()
+        attempts = 0
+        for he in hover_events:
+            if attempts >= 10:
+                break
+            text = (he.get("txt") or "").strip()
+            if not text or len(text) > 80 or text in seen:
+                continue
+            seen.add(text)
+            attempts += 1
+            try:
+                element = page.locator(f"text={text}")
+                # wait_until=commit returns on response headers instead of
+                # waiting for the full page load.
+                with page.expect_navigation(timeout=3000, wait_until="commit"):
+                    element.first.click(timeout=1000)
+                navigations.append({"text": text, "url": page.url})
+                page.go_back(wait_until="commit")
+            except Exception:
+                continue
+
+        return {"url": page.url, "snapshot": _compact_snapshot(page),
+                "hover_events": hover_events[:50],
+                "navigations": navigations}